@@ -4,7 +4,9 @@ Tests of the core auth models (Role, Membership, Collection, FacilityUser, etc).
 
 from __future__ import absolute_import, print_function, unicode_literals
 
+import pytest
 from django.core.exceptions import ValidationError
+from django.db.models import Count
 from django.db.utils import IntegrityError
 from django.test import TestCase
 
@@ -12,90 +14,157 @@ from kolibri.core.device.models import DeviceSettings
 
 from .helpers import create_superuser
 
-from ..constants import role_kinds, collection_kinds
+from ..constants.collection_kinds import FACILITY
+from ..constants.role_kinds import ADMIN, COACH
 from ..models import FacilityUser, Facility, Classroom, LearnerGroup, Role, Membership, Collection
 from ..errors import UserDoesNotHaveRoleError, UserHasRoleOnlyIndirectlyThroughHierarchyError,\
     UserIsMemberOnlyIndirectlyThroughHierarchyError, InvalidRoleKind, UserIsNotMemberError
 
 
-class CollectionRoleMembershipDeletionTestCase(TestCase):
+def _prepare_for_bulk_create(obj):
     """
-    Tests that removing users from a Collection deletes the corresponding Role, and that deleting a Collection
-    or FacilityUser deletes all associated Roles and Memberships.
+    Do the work that ``save`` would otherwise do for a Morango-syncable model instance, as ``bulk_create`` bypasses it:
+    infer the dataset, calculate the UUID (which also sets the Morango source ID and partition), and mark it dirty.
     """
+    obj.ensure_dataset()
+    obj.id = obj.id or obj.calculate_uuid()
+    obj._morango_dirty_bit = True
+    return obj
 
-    def setUp(self):
 
-        self.facility = Facility.objects.create()
+def _bulk_assign(assignments):
+    """
+    Create a ``Role`` for each ``(user, collection, kind)`` tuple, with a single query. Unlike ``add_role``, this
+    doesn't check for an existing ``Role`` first, so it's only for use in building fresh fixtures.
+    """
+    return Role.objects.bulk_create([
+        _prepare_for_bulk_create(Role(user=user, collection=collection, kind=kind)) for user, collection, kind in assignments
+    ])
+
+
+def _bulk_add_members(users, collection):
+    """
+    Make each of the users a member of the collection, with a single query. As with ``_bulk_assign``, this doesn't
+    check for an existing ``Membership`` first.
+    """
+    return Membership.objects.bulk_create([
+        _prepare_for_bulk_create(Membership(user=user, collection=collection)) for user in users
+    ])
+
+
+def _role_counts_by_collection(kind, user=None):
+    """
+    Return a dict mapping collection IDs to the number of ``Roles`` of the given kind for each (optionally limited to
+    the given user), fetched with a single aggregate query.
+    """
+    roles = Role.objects.filter(kind=kind)
+    if user is not None:
+        roles = roles.filter(user=user)
+    return dict(roles.values_list("collection_id").annotate(Count("id")))
 
-        learner, classroom_coach, facility_admin = self.learner, self.classroom_coach, self.facility_admin = (
-            FacilityUser.objects.create(username='foo', facility=self.facility),
-            FacilityUser.objects.create(username='bar', facility=self.facility),
-            FacilityUser.objects.create(username='baz', facility=self.facility),
-        )
 
-        self.facility.add_admin(facility_admin)
+class FacilityHierarchyTestCase(TestCase):
+    """
+    Base class for test cases that share a Facility containing a Classroom containing a LearnerGroup, with
+    a facility admin, a classroom coach, and a learner in the group. These are created once per class, in
+    ``setUpTestData``; subclasses can set the collection names used.
+    """
+
+    facility_name = ""
+    classroom_name = ""
+    learner_group_name = ""
+
+    @classmethod
+    def setUpTestData(cls):
+
+        cls.facility = Facility.objects.create(name=cls.facility_name)
+
+        learner, classroom_coach, facility_admin = cls.learner, cls.classroom_coach, cls.facility_admin = FacilityUser.objects.bulk_create([
+            _prepare_for_bulk_create(FacilityUser(username=username, facility=cls.facility)) for username in ('foo', 'bar', 'baz')
+        ])
+
+        cls.cr = Classroom.objects.create(name=cls.classroom_name, parent=cls.facility)
+        cls.lg = LearnerGroup.objects.create(name=cls.learner_group_name, parent=cls.cr)
 
-        self.cr = Classroom.objects.create(parent=self.facility)
-        self.cr.add_coach(classroom_coach)
+        _bulk_assign([
+            (facility_admin, cls.facility, ADMIN),
+            (classroom_coach, cls.cr, COACH),
+        ])
+        _bulk_add_members([learner], cls.lg)
 
-        self.lg = LearnerGroup.objects.create(parent=self.cr)
-        self.lg.add_learner(learner)
+
+class CollectionRoleMembershipDeletionTestCase(FacilityHierarchyTestCase):
+    """
+    Tests that removing users from a Collection deletes the corresponding Role, and that deleting a Collection
+    or FacilityUser deletes all associated Roles and Memberships.
+
+    The fixtures are shared across tests, so tests that delete objects fetch a fresh instance to delete,
+    rather than clearing the primary key on the shared one.
+    """
 
     def test_remove_learner(self):
-        self.assertTrue(self.learner.is_member_of(self.lg))
-        self.assertTrue(self.learner.is_member_of(self.cr))
-        self.assertTrue(self.learner.is_member_of(self.facility))
-        self.assertEqual(Membership.objects.filter(user=self.learner, collection=self.lg).count(), 1)
+        with self.assertNumQueries(2):  # the Facility membership is implicit, so it needs no query
+            self.assertTrue(self.learner.is_member_of(self.lg))
+            self.assertTrue(self.learner.is_member_of(self.cr))
+            self.assertTrue(self.learner.is_member_of(self.facility))
+        memberships_before = set(Membership.objects.filter(user=self.learner).values_list("collection_id", flat=True))
+        self.assertIn(self.lg.id, memberships_before)
 
         self.lg.remove_learner(self.learner)
 
-        self.assertFalse(self.learner.is_member_of(self.lg))
-        self.assertFalse(self.learner.is_member_of(self.cr))
-        self.assertTrue(self.learner.is_member_of(self.facility))  # always a member of one's own facility
-        self.assertEqual(Membership.objects.filter(user=self.learner, collection=self.lg).count(), 0)
+        with self.assertNumQueries(2):
+            self.assertFalse(self.learner.is_member_of(self.lg))
+            self.assertFalse(self.learner.is_member_of(self.cr))
+            self.assertTrue(self.learner.is_member_of(self.facility))  # always a member of one's own facility
+        memberships_after = set(Membership.objects.filter(user=self.learner).values_list("collection_id", flat=True))
+        self.assertSetEqual(memberships_after, memberships_before - {self.lg.id})
 
         with self.assertRaises(UserIsNotMemberError):
             self.lg.remove_learner(self.learner)
 
     def test_remove_coach(self):
-        self.assertTrue(self.classroom_coach.has_role_for_collection(role_kinds.COACH, self.lg))
-        self.assertTrue(self.classroom_coach.has_role_for_collection(role_kinds.COACH, self.cr))
-        self.assertFalse(self.classroom_coach.has_role_for_collection(role_kinds.COACH, self.facility))
-        self.assertFalse(self.classroom_coach.has_role_for_collection(role_kinds.ADMIN, self.lg))
-        self.assertTrue(self.classroom_coach.has_role_for_user(role_kinds.COACH, self.learner))
-        self.assertFalse(self.classroom_coach.has_role_for_user(role_kinds.COACH, self.facility_admin))
-        self.assertFalse(self.classroom_coach.has_role_for_user(role_kinds.ADMIN, self.learner))
-        self.assertEqual(Role.objects.filter(user=self.classroom_coach, kind=role_kinds.COACH, collection=self.cr).count(), 1)
+        # checking the superuser status also caches the (lack of) device permissions, so it isn't counted below
+        self.assertFalse(self.classroom_coach.is_superuser)
+        with self.assertNumQueries(5):
+            self.assertSetEqual(self.classroom_coach.get_roles_for_collection(self.lg), {COACH})
+            self.assertSetEqual(self.classroom_coach.get_roles_for_collection(self.cr), {COACH})
+            self.assertSetEqual(self.classroom_coach.get_roles_for_collection(self.facility), set())
+            self.assertSetEqual(self.classroom_coach.get_roles_for_user(self.learner), {COACH})
+            self.assertSetEqual(self.classroom_coach.get_roles_for_user(self.facility_admin), set())
+        roles_before = set(Role.objects.filter(user=self.classroom_coach).values_list("collection_id", "kind"))
+        self.assertIn((self.cr.id, COACH), roles_before)
 
         self.cr.remove_coach(self.classroom_coach)
 
-        self.assertFalse(self.classroom_coach.has_role_for_collection(role_kinds.COACH, self.lg))
-        self.assertFalse(self.classroom_coach.has_role_for_collection(role_kinds.COACH, self.cr))
-        self.assertFalse(self.classroom_coach.has_role_for_collection(role_kinds.COACH, self.facility))
-        self.assertFalse(self.classroom_coach.has_role_for_collection(role_kinds.ADMIN, self.lg))
-        self.assertFalse(self.classroom_coach.has_role_for_user(role_kinds.COACH, self.learner))
-        self.assertFalse(self.classroom_coach.has_role_for_user(role_kinds.COACH, self.facility_admin))
-        self.assertFalse(self.classroom_coach.has_role_for_user(role_kinds.ADMIN, self.learner))
-        self.assertEqual(Role.objects.filter(user=self.classroom_coach, kind=role_kinds.COACH, collection=self.cr).count(), 0)
+        with self.assertNumQueries(5):
+            self.assertSetEqual(self.classroom_coach.get_roles_for_collection(self.lg), set())
+            self.assertSetEqual(self.classroom_coach.get_roles_for_collection(self.cr), set())
+            self.assertSetEqual(self.classroom_coach.get_roles_for_collection(self.facility), set())
+            self.assertSetEqual(self.classroom_coach.get_roles_for_user(self.learner), set())
+            self.assertSetEqual(self.classroom_coach.get_roles_for_user(self.facility_admin), set())
+        roles_after = set(Role.objects.filter(user=self.classroom_coach).values_list("collection_id", "kind"))
+        self.assertSetEqual(roles_after, roles_before - {(self.cr.id, COACH)})
 
         with self.assertRaises(UserDoesNotHaveRoleError):
             self.cr.remove_coach(self.classroom_coach)
 
     def test_remove_admin(self):
-        self.assertTrue(self.facility_admin.has_role_for_collection(role_kinds.ADMIN, self.lg))
-        self.assertTrue(self.facility_admin.has_role_for_collection(role_kinds.ADMIN, self.cr))
-        self.assertTrue(self.facility_admin.has_role_for_collection(role_kinds.ADMIN, self.facility))
-        self.assertFalse(self.facility_admin.has_role_for_collection(role_kinds.COACH, self.lg))
-        self.assertTrue(self.facility_admin.has_role_for_user(role_kinds.ADMIN, self.learner))
-        self.assertTrue(self.facility_admin.has_role_for_user(role_kinds.ADMIN, self.facility_admin))
-        self.assertTrue(self.facility_admin.has_role_for_user(role_kinds.ADMIN, self.classroom_coach))
-        self.assertFalse(self.facility_admin.has_role_for_user(role_kinds.COACH, self.learner))
-        self.assertEqual(Role.objects.filter(user=self.facility_admin, kind=role_kinds.ADMIN, collection=self.facility).count(), 1)
+        # checking the superuser status also caches the (lack of) device permissions, so it isn't counted below
+        self.assertFalse(self.facility_admin.is_superuser)
+        with self.assertNumQueries(6):
+            self.assertSetEqual(self.facility_admin.get_roles_for_collection(self.lg), {ADMIN})
+            self.assertSetEqual(self.facility_admin.get_roles_for_collection(self.cr), {ADMIN})
+            self.assertSetEqual(self.facility_admin.get_roles_for_collection(self.facility), {ADMIN})
+            self.assertSetEqual(self.facility_admin.get_roles_for_user(self.learner), {ADMIN})
+            self.assertSetEqual(self.facility_admin.get_roles_for_user(self.facility_admin), {ADMIN})
+            self.assertSetEqual(self.facility_admin.get_roles_for_user(self.classroom_coach), {ADMIN})
+        roles_before = set(Role.objects.filter(user=self.facility_admin).values_list("collection_id", "kind"))
+        self.assertIn((self.facility.id, ADMIN), roles_before)
 
         self.facility.remove_admin(self.facility_admin)
 
-        self.assertEqual(Role.objects.filter(user=self.facility_admin, kind=role_kinds.ADMIN, collection=self.facility).count(), 0)
+        roles_after = set(Role.objects.filter(user=self.facility_admin).values_list("collection_id", "kind"))
+        self.assertSetEqual(roles_after, roles_before - {(self.facility.id, ADMIN)})
 
         with self.assertRaises(UserDoesNotHaveRoleError):
             self.facility.remove_admin(self.facility_admin)
@@ -118,65 +187,55 @@ class CollectionRoleMembershipDeletionTestCase(TestCase):
 
     def test_delete_learner_group(self):
         """ Deleting a LearnerGroup should delete its associated Memberships as well """
-        self.assertEqual(Membership.objects.filter(collection=self.lg.id).count(), 1)
-        self.lg.delete()
-        self.assertEqual(Membership.objects.filter(collection=self.lg.id).count(), 0)
-
-    def test_delete_classroom_pt1(self):
-        """ Deleting a Classroom should delete its associated Roles as well """
-        self.assertEqual(Role.objects.filter(collection=self.cr.id).count(), 1)
-        self.cr.delete()
-        self.assertEqual(Role.objects.filter(collection=self.cr.id).count(), 0)
-
-    def test_delete_classroom_pt2(self):
-        """ Deleting a Classroom should delete its associated LearnerGroups """
-        self.assertEqual(LearnerGroup.objects.count(), 1)
-        self.cr.delete()
-        self.assertEqual(LearnerGroup.objects.count(), 0)
-
-    def test_delete_facility_pt1(self):
-        """ Deleting a Facility should delete associated Roles as well """
-        self.assertEqual(Role.objects.filter(collection=self.facility.id).count(), 1)
-        self.facility.delete()
-        self.assertEqual(Role.objects.filter(collection=self.facility.id).count(), 0)
-
-    def test_delete_facility_pt2(self):
-        """ Deleting a Facility should delete Classrooms under it. """
-        self.assertEqual(Classroom.objects.count(), 1)
-        self.facility.delete()
-        self.assertEqual(Classroom.objects.count(), 0)
-
-    def test_delete_facility_pt3(self):
-        """ Deleting a Facility should delete *every* Collection under it and associated Roles """
-        self.facility.delete()
-        self.assertEqual(Collection.objects.count(), 0)
-        self.assertEqual(Role.objects.count(), 0)
+        self.assertTrue(Membership.objects.filter(collection=self.lg.id).exists())
+        LearnerGroup.objects.get(id=self.lg.id).delete()
+        self.assertFalse(Membership.objects.filter(collection=self.lg.id).exists())
+
+    def test_delete_classroom_cascades(self):
+        """ Deleting a Classroom should delete its associated Roles and LearnerGroups as well """
+        self.assertTrue(Role.objects.filter(collection=self.cr.id).exists())
+        self.assertTrue(LearnerGroup.objects.exists())
+        Classroom.objects.get(id=self.cr.id).delete()
+        self.assertFalse(Role.objects.filter(collection=self.cr.id).exists())
+        self.assertFalse(LearnerGroup.objects.exists())
+
+    def test_delete_facility_cascades(self):
+        """ Deleting a Facility should delete *every* Collection under it, and all their associated Roles """
+        self.assertTrue(Role.objects.filter(collection=self.facility.id).exists())
+        self.assertTrue(Classroom.objects.exists())
+        Facility.objects.get(id=self.facility.id).delete()
+        self.assertFalse(Role.objects.filter(collection=self.facility.id).exists())
+        self.assertFalse(Classroom.objects.exists())
+        self.assertFalse(Collection.objects.exists())
+        self.assertFalse(Role.objects.exists())
 
     def test_delete_facility_user(self):
         """ Deleting a FacilityUser should delete associated Memberships """
         membership = Membership.objects.get(user=self.learner)
-        self.learner.delete()
-        self.assertEqual(Membership.objects.filter(id=membership.id).count(), 0)
+        FacilityUser.objects.get(id=self.learner.id).delete()
+        self.assertFalse(Membership.objects.filter(id=membership.id).exists())
 
 
 class CollectionRelatedObjectTestCase(TestCase):
 
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
 
-        self.facility = Facility.objects.create()
+        cls.facility = Facility.objects.create()
 
-        users = self.users = [FacilityUser.objects.create(
+        users = cls.users = [_prepare_for_bulk_create(FacilityUser(
             username="foo%s" % i,
-            facility=self.facility,
-        ) for i in range(10)]
+            facility=cls.facility,
+        )) for i in range(10)]
+        FacilityUser.objects.bulk_create(users)
 
-        self.facility.add_admins(users[8:9])
+        cls.facility.add_admins(users[8:9])
 
-        self.cr = Classroom.objects.create(parent=self.facility)
-        self.cr.add_coaches(users[5:8])
+        cls.cr = Classroom.objects.create(parent=cls.facility)
+        cls.cr.add_coaches(users[5:8])
 
-        self.lg = LearnerGroup.objects.create(parent=self.cr)
-        self.lg.add_learners(users[0:5])
+        cls.lg = LearnerGroup.objects.create(parent=cls.cr)
+        cls.lg.add_learners(users[0:5])
 
     def test_get_learner_groups(self):
         self.assertSetEqual({self.lg.pk}, set(lg.pk for lg in self.cr.get_learner_groups()))
@@ -194,44 +253,6 @@ class CollectionsTestCase(TestCase):
         self.facility = Facility.objects.create()
         self.classroom = Classroom.objects.create(parent=self.facility)
 
-    def test_add_and_remove_admin(self):
-        user = FacilityUser.objects.create(username='foo', facility=self.facility)
-        self.classroom.add_admin(user)
-        self.facility.add_admin(user)
-        self.assertEqual(Role.objects.filter(user=user, kind=role_kinds.ADMIN, collection=self.classroom).count(), 1)
-        self.assertEqual(Role.objects.filter(user=user, kind=role_kinds.ADMIN, collection=self.facility).count(), 1)
-        self.classroom.remove_admin(user)
-        self.facility.remove_admin(user)
-        self.assertEqual(Role.objects.filter(user=user, kind=role_kinds.ADMIN, collection=self.classroom).count(), 0)
-        self.assertEqual(Role.objects.filter(user=user, kind=role_kinds.ADMIN, collection=self.facility).count(), 0)
-
-    def test_add_and_remove_coach(self):
-        user = FacilityUser.objects.create(username='foo', facility=self.facility)
-        self.classroom.add_coach(user)
-        self.facility.add_coach(user)
-        self.assertEqual(Role.objects.filter(user=user, kind=role_kinds.COACH, collection=self.classroom).count(), 1)
-        self.assertEqual(Role.objects.filter(user=user, kind=role_kinds.COACH, collection=self.facility).count(), 1)
-        self.classroom.remove_coach(user)
-        self.facility.remove_coach(user)
-        self.assertEqual(Role.objects.filter(user=user, kind=role_kinds.COACH, collection=self.classroom).count(), 0)
-        self.assertEqual(Role.objects.filter(user=user, kind=role_kinds.COACH, collection=self.facility).count(), 0)
-
-    def test_add_coaches(self):
-        user1 = FacilityUser.objects.create(username='foo1', facility=self.facility)
-        user2 = FacilityUser.objects.create(username='foo2', facility=self.facility)
-        self.classroom.add_coaches([user1, user2])
-        self.facility.add_coaches([user1, user2])
-        self.assertEqual(Role.objects.filter(kind=role_kinds.COACH, collection=self.classroom).count(), 2)
-        self.assertEqual(Role.objects.filter(kind=role_kinds.COACH, collection=self.facility).count(), 2)
-
-    def test_add_admins(self):
-        user1 = FacilityUser.objects.create(username='foo1', facility=self.facility)
-        user2 = FacilityUser.objects.create(username='foo2', facility=self.facility)
-        self.classroom.add_admins([user1, user2])
-        self.facility.add_admins([user1, user2])
-        self.assertEqual(Role.objects.filter(kind=role_kinds.ADMIN, collection=self.classroom).count(), 2)
-        self.assertEqual(Role.objects.filter(kind=role_kinds.ADMIN, collection=self.facility).count(), 2)
-
     def test_add_classroom(self):
         classroom = Classroom.objects.create(parent=self.facility)
         self.assertEqual(Classroom.objects.count(), 2)
@@ -276,13 +297,50 @@ class CollectionsTestCase(TestCase):
             Collection(name="qqq", parent=self.facility).full_clean()
 
 
+@pytest.fixture
+def facility(db):
+    return Facility.objects.create()
+
+
+@pytest.fixture
+def classroom(facility):
+    return Classroom.objects.create(parent=facility)
+
+
+@pytest.mark.parametrize("kind,add_one,remove_one", [
+    (ADMIN, "add_admin", "remove_admin"),
+    (COACH, "add_coach", "remove_coach"),
+])
+def test_add_and_remove_role(facility, classroom, kind, add_one, remove_one):
+    user = FacilityUser.objects.create(username='foo', facility=facility)
+    getattr(classroom, add_one)(user)
+    getattr(facility, add_one)(user)
+    assert _role_counts_by_collection(kind, user=user) == {classroom.id: 1, facility.id: 1}
+    getattr(classroom, remove_one)(user)
+    getattr(facility, remove_one)(user)
+    assert _role_counts_by_collection(kind, user=user) == {}
+
+
+@pytest.mark.parametrize("kind,add_many", [
+    (ADMIN, "add_admins"),
+    (COACH, "add_coaches"),
+])
+def test_add_roles(facility, classroom, kind, add_many):
+    user1 = FacilityUser.objects.create(username='foo1', facility=facility)
+    user2 = FacilityUser.objects.create(username='foo2', facility=facility)
+    getattr(classroom, add_many)([user1, user2])
+    getattr(facility, add_many)([user1, user2])
+    assert _role_counts_by_collection(kind) == {classroom.id: 2, facility.id: 2}
+
+
 class RoleErrorTestCase(TestCase):
 
-    def setUp(self):
-        self.facility = Facility.objects.create()
-        self.classroom = Classroom.objects.create(parent=self.facility)
-        self.learner_group = LearnerGroup.objects.create(parent=self.classroom)
-        self.facility_user = FacilityUser.objects.create(username="blah", password="#", facility=self.facility)
+    @classmethod
+    def setUpTestData(cls):
+        cls.facility = Facility.objects.create()
+        cls.classroom = Classroom.objects.create(parent=cls.facility)
+        cls.learner_group = LearnerGroup.objects.create(parent=cls.classroom)
+        cls.facility_user = FacilityUser.objects.create(username="blah", password="#", facility=cls.facility)
 
     def test_invalid_role_kind(self):
         with self.assertRaises(InvalidRoleKind):
@@ -293,27 +351,31 @@ class RoleErrorTestCase(TestCase):
 
 class SuperuserRoleMembershipTestCase(TestCase):
 
-    def setUp(self):
-        self.facility = Facility.objects.create()
-        self.classroom = Classroom.objects.create(parent=self.facility)
-        self.learner_group = LearnerGroup.objects.create(parent=self.classroom)
-        self.facility_user = FacilityUser.objects.create(username="blah", password="#", facility=self.facility)
-        self.superuser = create_superuser(self.facility)
-        self.superuser2 = create_superuser(self.facility, username="superuser2")
+    @classmethod
+    def setUpTestData(cls):
+        cls.facility = Facility.objects.create()
+        cls.classroom = Classroom.objects.create(parent=cls.facility)
+        cls.learner_group = LearnerGroup.objects.create(parent=cls.classroom)
+        cls.facility_user = FacilityUser.objects.create(username="blah", password="#", facility=cls.facility)
+        cls.superuser = create_superuser(cls.facility)
+        cls.superuser2 = create_superuser(cls.facility, username="superuser2")
 
     def test_superuser_is_not_member_of_any_sub_collection(self):
-        self.assertFalse(self.superuser.is_member_of(self.classroom))
-        self.assertTrue(self.superuser.is_member_of(self.facility))
-        self.assertFalse(self.superuser.is_member_of(self.learner_group))
+        with self.assertNumQueries(2):  # the Facility membership is implicit, so it needs no query
+            self.assertFalse(self.superuser.is_member_of(self.classroom))
+            self.assertTrue(self.superuser.is_member_of(self.facility))
+            self.assertFalse(self.superuser.is_member_of(self.learner_group))
 
     def test_superuser_is_admin_for_everything(self):
-        self.assertSetEqual(self.superuser.get_roles_for_collection(self.classroom), set([role_kinds.ADMIN]))
-        self.assertSetEqual(self.superuser.get_roles_for_collection(self.facility), set([role_kinds.ADMIN]))
-        self.assertSetEqual(self.superuser.get_roles_for_user(self.facility_user), set([role_kinds.ADMIN]))
-        self.assertSetEqual(self.superuser.get_roles_for_user(self.superuser), set([role_kinds.ADMIN]))
-        self.assertSetEqual(self.superuser.get_roles_for_user(self.superuser2), set([role_kinds.ADMIN]))
-        self.assertTrue(self.superuser.has_role_for_user([role_kinds.ADMIN], self.facility_user))
-        self.assertTrue(self.superuser.has_role_for_collection([role_kinds.ADMIN], self.facility))
+        # the superuser's device permissions were cached on it when they were created, so no queries are needed
+        with self.assertNumQueries(0):
+            self.assertSetEqual(self.superuser.get_roles_for_collection(self.classroom), set([ADMIN]))
+            self.assertSetEqual(self.superuser.get_roles_for_collection(self.facility), set([ADMIN]))
+            self.assertSetEqual(self.superuser.get_roles_for_user(self.facility_user), set([ADMIN]))
+            self.assertSetEqual(self.superuser.get_roles_for_user(self.superuser), set([ADMIN]))
+            self.assertSetEqual(self.superuser.get_roles_for_user(self.superuser2), set([ADMIN]))
+            self.assertTrue(self.superuser.has_role_for_user([ADMIN], self.facility_user))
+            self.assertTrue(self.superuser.has_role_for_collection([ADMIN], self.facility))
 
 
 class SuperuserTestCase(TestCase):
@@ -336,36 +398,21 @@ class SuperuserTestCase(TestCase):
         self.assertTrue(superuser.has_perms(["someperm"], object()))
         self.assertTrue(superuser.has_module_perms("module.someapp"))
 
-class StringMethodTestCase(TestCase):
-
-    def setUp(self):
+class StringMethodTestCase(FacilityHierarchyTestCase):
 
-        self.facility = Facility.objects.create(name="Arkham")
-
-        learner, classroom_coach, facility_admin = self.learner, self.classroom_coach, self.facility_admin = (
-            FacilityUser.objects.create(username='foo', facility=self.facility),
-            FacilityUser.objects.create(username='bar', facility=self.facility),
-            FacilityUser.objects.create(username='baz', facility=self.facility),
-        )
-
-        self.facility.add_admin(facility_admin)
-
-        self.cr = Classroom.objects.create(name="Classroom X", parent=self.facility)
-        self.cr.add_coach(classroom_coach)
-
-        self.lg = LearnerGroup.objects.create(name="Oodles of Fun", parent=self.cr)
-        self.lg.add_learner(learner)
-
-        self.superuser = create_superuser(self.facility)
+    facility_name = "Arkham"
+    classroom_name = "Classroom X"
+    learner_group_name = "Oodles of Fun"
 
     def test_facility_user_str_method(self):
         self.assertEqual(str(self.learner), '"foo"@"Arkham"')
 
     def test_superuser_str_method(self):
-        self.assertEqual(str(self.superuser), '"superuser"@"Arkham"')
+        superuser = create_superuser(self.facility)
+        self.assertEqual(str(superuser), '"superuser"@"Arkham"')
 
     def test_collection_str_method(self):
-        self.assertEqual(str(Collection.objects.filter(kind=collection_kinds.FACILITY)[0]), '"Arkham" (facility)')
+        self.assertEqual(str(Collection.objects.filter(kind=FACILITY)[0]), '"Arkham" (facility)')
 
     def test_membership_str_method(self):
         self.assertEqual(str(self.learner.memberships.all()[0]), '"foo"@"Arkham"\'s membership in "Oodles of Fun" (learnergroup)')
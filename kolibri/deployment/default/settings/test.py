@@ -12,3 +12,7 @@ if 'KOLIBRI_HOME' not in os.environ:
 from .base import *  # noqa isort:skip @UnusedWildImport
 
 KOLIBRI_SKIP_AUTO_DATABASE_MIGRATION = False
+
+# Keep the SQLite test database in memory (Django's default for SQLite, but made explicit here so that it isn't lost
+# if a test database name gets configured), so that test writes never have to be flushed to disk.
+DATABASES['default']['TEST'] = {'NAME': ':memory:'}  # noqa